@@ -1,6 +1,17 @@
+import re
+import numpy as np
+import orjson
+import ijson
+from array import array
+from math import ceil
+from time import time
+from itertools import cycle
+from tqdm import tqdm
 from requests import session
-from pandas import DataFrame, read_csv
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pandas import DataFrame, read_parquet, to_datetime
+from concurrent.futures import ThreadPoolExecutor
 from os import makedirs, path
 from os.path import isdir, isfile
 from shutil import rmtree
@@ -12,7 +23,42 @@ CODE_FREQUENCY_FILE_NAME = 'code_frequency'
 ISSUES_FILE_NAME = 'issues'
 STARGAZERS_FILE_NAME = 'stargazers'
 COMMIT_ACTIVITY_FILE_NAME = 'commit_activity'
+ETAGS_FILE_NAME = 'etags'
 CACHE_DIR = 'data'
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+PAGE_SIZE = 100
+MAX_WORKERS = 8
+POOL_SIZE = 32
+GRAPHQL_URL = 'https://api.github.com/graphql'
+
+# the page number of the last page in the Link header of a paginated response
+LAST_PAGE_REGEX = re.compile(r'[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+# the GraphQL queries alias their fields to the names used by the REST API,
+# so the same parsing code can be used for both sources
+ISSUES_QUERY = '''
+query($owner: String!, $repo: String!, $cursor: String, $pageSize: Int!) {
+  repository(owner: $owner, name: $repo) {
+    connection: issues(first: $pageSize, after: $cursor, states: [OPEN]) {
+      totalCount
+      pageInfo { endCursor hasNextPage }
+      items: nodes { id: databaseId state created_at: createdAt }
+    }
+  }
+}
+'''
+
+STARGAZERS_QUERY = '''
+query($owner: String!, $repo: String!, $cursor: String, $pageSize: Int!) {
+  repository(owner: $owner, name: $repo) {
+    connection: stargazers(first: $pageSize, after: $cursor) {
+      totalCount
+      pageInfo { endCursor hasNextPage }
+      items: edges { starred_at: starredAt user: node { login } }
+    }
+  }
+}
+'''
 
 
 class Downloader:
@@ -26,21 +72,34 @@ class Downloader:
         self.__url = f'https://api.github.com/repos/{owner}/{repo}'
         self.__repo = repo
         self.__owner = owner
-        self.__session = session()
         self.__cache_path = path.join(CACHE_DIR, owner, repo)
         self.__useCache = useCacheIfAvailable
         self.__verbose = verbose
 
+        # the token can be a single GitHub Oauth token or a list of tokens, whose sessions are used in turns,
+        # so their rate limits add up
+        tokens = [token] if token is None or isinstance(token, str) else token
+        tokens = [token.strip() for token in tokens if token and token.strip()]
+
+        # the GraphQL API is not available for anonymous users
+        self.__useGraphQL = bool(tokens)
+
+        self.__sessions = [
+            self.__create_session(token) for token in tokens or ['']
+        ]
+        self.__session_indices = cycle(range(len(self.__sessions)))
+        # reset times of the rate limits of the sessions which have run out of requests
+        self.__rate_limit_resets = {}
+
         # create cache directory if does not exists yet
         if not isdir(self.__cache_path):
             makedirs(self.__cache_path)
 
-        # if the user provided a GitHub Oauth token then the downloader will use it in every request
-        if token:
-            self.__session.headers.update({'Authorization': f'token {token}'})
+        # responses of earlier requests stored with their ETag
+        self.__etags = self.__read_etags()
 
         # checking if the requested repository exists
-        response = self.__session.get(self.__url)
+        response = self.__request('GET', self.__url)
 
         if response.ok:
             self.__log(
@@ -52,6 +111,55 @@ class Downloader:
         else:
             self.__rasie_error(response)
 
+    def __create_session(self, token):
+        '''Creates a session which uses the given GitHub Oauth token in every request, if there is one.'''
+        new_session = session()
+
+        # the connection pool is large enough for keeping the connections of the concurrent requests alive,
+        # and the requests failing because of temporary server errors are retried, returning the last
+        # response if they keep failing, so it goes through the usual error handling
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE,
+                              pool_maxsize=POOL_SIZE,
+                              max_retries=Retry(
+                                  total=3,
+                                  backoff_factor=0.5,
+                                  status_forcelist=[502, 503, 504],
+                                  raise_on_status=False))
+        new_session.mount('https://', adapter)
+
+        if token:
+            new_session.headers.update({'Authorization': f'token {token}'})
+
+        return new_session
+
+    def __request(self, method, url, **kwargs):
+        '''Sends a request with the next session in turn. The sessions which have run out of requests are skipped
+        until their rate limit is reset, and the request is sent again with another session.'''
+
+        # the turn is taken only once, as the concurrent requests share the cycle,
+        # then every session is tried once starting from it
+        start = next(self.__session_indices)
+
+        for offset in range(len(self.__sessions)):
+            index = (start + offset) % len(self.__sessions)
+
+            if self.__rate_limit_resets.get(index, 0) > time():
+                continue
+
+            response = self.__sessions[index].request(method, url, **kwargs)
+
+            if response.status_code == 403 and response.headers.get(
+                    'X-RateLimit-Remaining') == '0':
+                self.__rate_limit_resets[index] = int(
+                    response.headers.get('X-RateLimit-Reset', 0))
+                continue
+
+            return response
+
+        raise ApiRateLimitError(
+            'API rate limit exceeded. Try to specify an OAuth token to increase your rate limit.'
+        )
+
     def __rasie_error(self, response):
         '''Raises a proper error in case of known problems or a general exception in case of unknown problem.'''
 
@@ -69,42 +177,194 @@ class Downloader:
             raise BadCredentialsError(
                 'Bad credentials were provided for the API.')
 
-        raise Exception(response.json()['message'])
+        raise Exception(orjson.loads(response.content)['message'])
 
-    def __call_api(self, path, headers={}):
-        response = self.__session.get(f'{self.__url}/{path}', headers=headers)
+    def __get(self, path, headers={}, stream=False):
+        '''Sends a GET request to the given API path and returns the response if it was successful.'''
+        response = self.__request('GET',
+                                  f'{self.__url}/{path}',
+                                  headers=headers,
+                                  stream=stream)
 
         if response.ok:
-            return response.json()
+            return response
         else:
             self.__rasie_error(response)
 
+    def __call_api(self, path, headers={}):
+        '''Returns the data of the given API path. If the response of an earlier request is stored with its ETag
+        then a conditional request is sent, which does not count against the rate limit if the data has not changed.'''
+        url = f'{self.__url}/{path}'
+        stored = self.__etags.get(url)
+
+        if stored:
+            headers = {**headers, 'If-None-Match': stored['etag']}
+
+        response = self.__get(path, headers)
+
+        if response.status_code == 304:
+            return stored['data']
+
+        data = orjson.loads(response.content)
+
+        # statistics still being computed are answered with 202 and must not be stored
+        if response.status_code == 200 and 'ETag' in response.headers:
+            self.__etags[url] = {
+                'etag': response.headers['ETag'],
+                'data': data
+            }
+
+        return data
+
+    def __call_api_stream(self, path):
+        '''Yields the items of the JSON array returned by the given API path. The array is parsed while it is
+        downloaded, so only the current item is kept in memory instead of the whole response.'''
+        response = self.__get(path, stream=True)
+
+        # the raw stream has to be decompressed while it is read
+        response.raw.decode_content = True
+
+        with response:
+            yield from ijson.items(response.raw, 'item')
+
+    def __call_api_paginated(self, path, description, headers={}):
+        '''Fetches every page of a paginated API path. The first page is requested alone for discovering
+        the number of pages from its Link header, then the remaining pages are requested concurrently.'''
+
+        def fetch_page(page):
+            return self.__call_api(f'{path}?per_page={PAGE_SIZE}&page={page}',
+                                   headers)
+
+        with tqdm(total=1,
+                  desc=description,
+                  unit='page',
+                  disable=not self.__verbose) as progress:
+            # the first page is always requested unconditionally as it carries the up-to-date Link header
+            response = self.__get(f'{path}?per_page={PAGE_SIZE}&page=1',
+                                  headers)
+            pages = [orjson.loads(response.content)]
+            progress.update()
+
+            # the number of the last page is read directly from the Link header,
+            # which is missing if all the items fit on the first page
+            last = LAST_PAGE_REGEX.search(response.headers.get('Link', ''))
+
+            if last:
+                last_page = int(last.group(1))
+                progress.total = last_page
+
+                with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                    for page in executor.map(fetch_page,
+                                             range(2, last_page + 1)):
+                        pages.append(page)
+                        progress.update()
+
+        return [item for page in pages for item in page]
+
+    def __call_graphql(self, query, variables):
+        '''Sends a query to the GraphQL API and returns the data of the response.'''
+        response = self.__request('POST',
+                                  GRAPHQL_URL,
+                                  json={
+                                      'query': query,
+                                      'variables': variables
+                                  })
+
+        if not response.ok:
+            self.__rasie_error(response)
+
+        result = orjson.loads(response.content)
+
+        # the GraphQL API reports most of the errors with a successful status code
+        if 'errors' in result:
+            error = result['errors'][0]
+
+            if error.get('type') == 'RATE_LIMITED':
+                raise ApiRateLimitError('API rate limit exceeded.')
+
+            if error.get('type') == 'NOT_FOUND':
+                raise NotFoundError(
+                    f"Repository '{self.__repo}' of user '{self.__owner}' not found."
+                )
+
+            raise Exception(error['message'])
+
+        return result['data']
+
+    def __call_graphql_paginated(self, query, description):
+        '''Fetches every item of the connection returned by the given query page by page using cursors.'''
+        items = []
+        cursor = None
+
+        with tqdm(desc=description, unit='page',
+                  disable=not self.__verbose) as progress:
+            while (True):
+                data = self.__call_graphql(
+                    query, {
+                        'owner': self.__owner,
+                        'repo': self.__repo,
+                        'cursor': cursor,
+                        'pageSize': PAGE_SIZE
+                    })
+                connection = data['repository']['connection']
+                items.extend(connection['items'])
+
+                progress.total = ceil(connection['totalCount'] / PAGE_SIZE)
+                progress.update()
+
+                if not connection['pageInfo']['hasNextPage']:
+                    break
+
+                cursor = connection['pageInfo']['endCursor']
+
+        return items
+
     def __save_cache(self, dataFrame, file_name):
         '''Method for saving (caching) a dataframe into a given file.'''
-        dataFrame.to_csv(path.join(self.__cache_path, f'{file_name}.csv'),
-                         sep='\t',
-                         encoding='utf-8')
+        dataFrame.to_parquet(
+            path.join(self.__cache_path, f'{file_name}.parquet'))
+        self.__save_etags()
+
+    def __save_etags(self):
+        '''Saves the stored responses with their ETags next to the cached data.'''
+        with open(path.join(self.__cache_path, f'{ETAGS_FILE_NAME}.json'),
+                  'wb') as file:
+            file.write(orjson.dumps(self.__etags))
+
+    def __read_etags(self):
+        '''Reads the stored responses with their ETags, or returns an empty dictionary if there are none.'''
+        etags_path = path.join(self.__cache_path, f'{ETAGS_FILE_NAME}.json')
+
+        if not isfile(etags_path):
+            return {}
+
+        with open(etags_path, 'rb') as file:
+            return orjson.loads(file.read())
 
     def __read_cache(self, file_name):
         '''Method for reading the cahced data into a pandas dataframe.'''
-        return read_csv(path.join(self.__cache_path, f'{file_name}.csv'),
-                        sep='\t',
-                        encoding='utf-8',
-                        index_col=0)
+        return read_parquet(
+            path.join(self.__cache_path, f'{file_name}.parquet'))
 
     def __is_cache_available(self, file_name):
         '''Checks whether there is cached data available or not.'''
-        return isfile(path.join(self.__cache_path, f'{file_name}.csv'))
+        return isfile(path.join(self.__cache_path, f'{file_name}.parquet'))
 
     def __log(self, text, end='\n'):
         '''Prints out the message of the downloader is in verbose mode.'''
         if self.__verbose:
             print(text, end=end)
 
+    def is_cached(self, *file_names):
+        '''Checks whether the cached data of all the given files is available and used by the downloader.'''
+        return self.__useCache and all(
+            self.__is_cache_available(file_name) for file_name in file_names)
+
     def delete_cache(self):
         '''Deletes all cache of the current repository.'''
         rmtree(self.__cache_path)
         makedirs(self.__cache_path)
+        self.__etags = {}
 
     def get_contributors_statistic(self):
         '''Get contributors list with additions, deletions, and commit counts.'''
@@ -117,50 +377,97 @@ class Downloader:
                 TOTAL_CONTRIBUTION_FILE_NAME), self.__read_cache(
                     WEEKLY_CONTRIBUTIONS_FILE_NAME)
 
-        data = self.__call_api('stats/contributors')
-
         total_contributions = []
-        weekly_contributions = []
+
+        # the weekly contributions are collected column by column into growing typed arrays,
+        # as the number of weeks is not known in advance while the response is streamed
+        users = []
+        week_unix_ts = array('q')
+        additions = array('q')
+        deletions = array('q')
+        commits = array('q')
 
         # parsing data into dataframes
-        for item in data:
+        for item in self.__call_api_stream('stats/contributors'):
+            user = item['author']['login']
+
             total_contributions.append({
                 'commits': item['total'],
-                'user': item['author']['login']
+                'user': user
             })
 
             for week in item['weeks']:
-                weekly_contributions.append({
-                    'user':
-                    item['author']['login'],
-                    'week_unix_ts':
-                    week['w'],
-                    'date':
-                    datetime.fromtimestamp(week['w']).date(),
-                    'additions':
-                    week['a'],
-                    'deletions':
-                    week['d'],
-                    'commits':
-                    week['c'],
-                })
+                users.append(user)
+                week_unix_ts.append(week['w'])
+                additions.append(week['a'])
+                deletions.append(week['d'])
+                commits.append(week['c'])
 
         self.total_contributions = DataFrame(total_contributions,
                                              columns=['user', 'commits'])
         self.__save_cache(self.total_contributions,
                           TOTAL_CONTRIBUTION_FILE_NAME)
 
-        self.weekly_contributions = DataFrame(weekly_contributions,
-                                              columns=[
-                                                  'user', 'week_unix_ts',
-                                                  'date', 'additions',
-                                                  'deletions', 'commits'
-                                              ])
+        users = np.array(users, dtype=object)
+        week_unix_ts = np.array(week_unix_ts, dtype=np.int64)
+        additions = np.array(additions, dtype=np.int64)
+        deletions = np.array(deletions, dtype=np.int64)
+        commits = np.array(commits, dtype=np.int64)
+
+        # every contributor has the same weeks, so only the distinct timestamps are converted to dates
+        weeks, week_indices = np.unique(week_unix_ts, return_inverse=True)
+        dates = to_datetime(weeks, unit='s').date[week_indices]
+
+        self.weekly_contributions = DataFrame({
+            'user': users,
+            'week_unix_ts': week_unix_ts,
+            'date': dates,
+            'additions': additions,
+            'deletions': deletions,
+            'commits': commits
+        })
         self.__save_cache(self.weekly_contributions,
                           WEEKLY_CONTRIBUTIONS_FILE_NAME)
 
         return self.total_contributions, self.weekly_contributions
 
+    def get_top_contributors(self, limit=None):
+        '''Returns the users and their commit counts as two arrays ordered by the commit counts, optionally only
+        the given number of top contributors. Only the total contributions are cached, the weekly ones are skipped.'''
+
+        if self.__useCache and self.__is_cache_available(
+                TOTAL_CONTRIBUTION_FILE_NAME):
+            total_contributions = self.__read_cache(
+                TOTAL_CONTRIBUTION_FILE_NAME)
+            users = total_contributions['user'].to_numpy(dtype=object)
+            commits = total_contributions['commits'].to_numpy(dtype=np.int64)
+        else:
+            users = []
+            commits = array('q')
+
+            for item in self.__call_api_stream('stats/contributors'):
+                users.append(item['author']['login'])
+                commits.append(item['total'])
+
+            users = np.array(users, dtype=object)
+            commits = np.array(commits, dtype=np.int64)
+
+            # the empty response of a statistic still being computed is not cached,
+            # so it is requested again next time
+            if len(users) > 0:
+                self.__save_cache(
+                    DataFrame({
+                        'user': users,
+                        'commits': commits
+                    }), TOTAL_CONTRIBUTION_FILE_NAME)
+
+        order = np.argsort(commits, kind='stable')
+
+        if limit is not None:
+            order = order[len(order) - min(limit, len(order)):]
+
+        return users[order], commits[order]
+
     def get_code_frequency_statistic(self):
         '''Returns a weekly aggregate of the number of additions and deletions pushed to the repository.'''
         if self.__useCache and self.__is_cache_available(
@@ -169,11 +476,19 @@ class Downloader:
 
         data = self.__call_api('stats/code_frequency')
 
-        self.code_frequency = DataFrame(
-            data, columns=['week_unix_ts', 'additions', 'deletions'])
-        self.code_frequency['date'] = self.code_frequency.apply(
-            lambda row: datetime.fromtimestamp(row.week_unix_ts).date(),
-            axis=1)
+        # every week is an array of the timestamp, the additions and the deletions, which is transposed
+        # into contiguous columns, the response is an empty object while the statistic is being computed
+        weeks = np.array(data or [], dtype=np.int64).reshape(-1, 3)
+        week_unix_ts, additions, deletions = weeks.T.copy()
+        dates = to_datetime(week_unix_ts, unit='s').date
+
+        # the columns are passed in their final order, so no column is added to the dataframe later
+        self.code_frequency = DataFrame({
+            'week_unix_ts': week_unix_ts,
+            'additions': additions,
+            'deletions': deletions,
+            'date': dates
+        })
         self.__save_cache(self.code_frequency, CODE_FREQUENCY_FILE_NAME)
 
         return self.code_frequency
@@ -184,35 +499,29 @@ class Downloader:
         if self.__useCache and self.__is_cache_available(ISSUES_FILE_NAME):
             return self.__read_cache(ISSUES_FILE_NAME)
 
-        self.__log('Fetching repository issues ', end='')
+        if self.__useGraphQL:
+            data = self.__call_graphql_paginated(ISSUES_QUERY,
+                                                 'Fetching repository issues')
+        else:
+            data = self.__call_api_paginated('issues',
+                                             'Fetching repository issues')
 
-        page = 1
         issues = []
 
-        while (True):
-            self.__log('.', end='')
-
-            data = self.__call_api(f'issues?per_page=100&page={page}')
-
-            if len(data) == 0:
-                break
-
-            for issue in data:
-                issues.append({
-                    'id':
-                    issue['id'],
-                    'state':
-                    issue['state'],
-                    'created_at':
-                    datetime.strptime(issue['created_at'],
-                                      '%Y-%m-%dT%H:%M:%SZ').date()
-                })
+        for issue in data:
+            # the REST API lists pull requests as issues too
+            if 'pull_request' in issue:
+                continue
 
-            page = page + 1
-
-        self.__log('.')
+            issues.append({
+                'id': issue['id'],
+                'state': issue['state'].lower(),
+                'created_at': issue['created_at']
+            })
 
         self.issues = DataFrame(issues, columns=['id', 'state', 'created_at'])
+        self.issues['created_at'] = to_datetime(
+            self.issues['created_at'], format=TIMESTAMP_FORMAT).dt.date
         self.__save_cache(self.issues, ISSUES_FILE_NAME)
 
         return self.issues
@@ -226,28 +535,18 @@ class Downloader:
 
         data = self.__call_api('stats/commit_activity')
 
-        commit_activity = []
-
-        for item in data:
-            commit_activity.append({
-                'week_unix_ts': item['week'],
-                'mon': item['days'][1],
-                'tue': item['days'][2],
-                'wed': item['days'][3],
-                'thu': item['days'][4],
-                'fri': item['days'][5],
-                'sat': item['days'][6],
-                'sun': item['days'][0],
-            })
+        # the days of the weeks start with sunday in the response
+        weeks = np.fromiter((item['week'] for item in data),
+                            dtype=np.int64,
+                            count=len(data))
+        days = np.array([item['days'] for item in data],
+                        dtype=np.int64).reshape(-1, 7)
 
-        self.commit_activity = DataFrame(commit_activity,
-                                         columns=[
-                                             'week_unix_ts', 'mon', 'tue',
-                                             'wed', 'thu', 'fri', 'sat', 'sun'
-                                         ])
-        self.commit_activity['week'] = self.commit_activity.apply(
-            lambda row: datetime.fromtimestamp(row.week_unix_ts).date(),
-            axis=1)
+        self.commit_activity = DataFrame(
+            days[:, [1, 2, 3, 4, 5, 6, 0]],
+            columns=['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'])
+        self.commit_activity.insert(0, 'week_unix_ts', weeks)
+        self.commit_activity['week'] = to_datetime(weeks, unit='s').date
 
         self.__save_cache(self.commit_activity, COMMIT_ACTIVITY_FILE_NAME)
 
@@ -259,35 +558,25 @@ class Downloader:
         if self.__useCache and self.__is_cache_available(STARGAZERS_FILE_NAME):
             return self.__read_cache(STARGAZERS_FILE_NAME)
 
-        self.__log('Fetching stargazers ', end='')
-
-        page = 1
-        stargazers = []
-
-        while (True):
-            self.__log('.', end='')
-
-            data = self.__call_api(
-                f'stargazers?per_page=100&page={page}',
+        if self.__useGraphQL:
+            data = self.__call_graphql_paginated(STARGAZERS_QUERY,
+                                                 'Fetching stargazers')
+        else:
+            data = self.__call_api_paginated(
+                'stargazers', 'Fetching stargazers',
                 {'Accept': 'application/vnd.github.v3.star+json'})
 
-            if len(data) == 0:
-                break
-
-            for stargazer in data:
-                stargazers.append({
-                    'user':
-                    stargazer['user']['login'],
-                    'starred_at':
-                    datetime.strptime(stargazer['starred_at'],
-                                      '%Y-%m-%dT%H:%M:%SZ').date()
-                })
-
-            page = page + 1
+        stargazers = []
 
-        self.__log('.')
+        for stargazer in data:
+            stargazers.append({
+                'user': stargazer['user']['login'],
+                'starred_at': stargazer['starred_at']
+            })
 
         self.stargazers = DataFrame(stargazers, columns=['user', 'starred_at'])
+        self.stargazers['starred_at'] = to_datetime(
+            self.stargazers['starred_at'], format=TIMESTAMP_FORMAT).dt.date
         self.__save_cache(self.stargazers, STARGAZERS_FILE_NAME)
 
-        return self.stargazers
\ No newline at end of file
+        return self.stargazers
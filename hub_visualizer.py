@@ -1,9 +1,19 @@
 import matplotlib.pyplot as plt
 import numpy as np
-from datetime import datetime
 from pandas import to_datetime
 from os import getenv
-from hub_downloader import Downloader
+from concurrent.futures import ThreadPoolExecutor
+from hub_downloader import (Downloader, TOTAL_CONTRIBUTION_FILE_NAME,
+                            CODE_FREQUENCY_FILE_NAME, STARGAZERS_FILE_NAME,
+                            COMMIT_ACTIVITY_FILE_NAME)
+
+# the cache files read by the getters of the downloader used for plotting
+CACHE_FILE_NAMES = {
+    'get_top_contributors': [TOTAL_CONTRIBUTION_FILE_NAME],
+    'get_code_frequency_statistic': [CODE_FREQUENCY_FILE_NAME],
+    'get_stargazers': [STARGAZERS_FILE_NAME],
+    'get_commit_activity': [COMMIT_ACTIVITY_FILE_NAME]
+}
 
 
 class Visualizer:
@@ -13,10 +23,35 @@ class Visualizer:
         self.__owner = owner
         self.__repo = repo
 
-        # uses the Downloader for getting data about a repository
-        self.__downloader = Downloader(owner, repo,
-                                       getenv('GITHUB_OAUTH_TOKEN'), useCache,
-                                       False)
+        # uses the Downloader for getting data about a repository,
+        # with one or more comma separated tokens from the environment
+        tokens = getenv('GITHUB_OAUTH_TOKEN', '').split(',')
+        self.__downloader = Downloader(owner, repo, tokens, useCache, False)
+
+        # data returned by the downloader, kept for the subsequent plots
+        self.__data = {}
+
+        # the available caches are read in parallel up front, so their file reads overlap
+        cached_getter_names = [
+            getter_name
+            for getter_name, file_names in CACHE_FILE_NAMES.items()
+            if self.__downloader.is_cached(*file_names)
+        ]
+
+        with ThreadPoolExecutor() as executor:
+            cached_data = executor.map(self.__call_getter, cached_getter_names)
+            self.__data.update(zip(cached_getter_names, cached_data))
+
+    def __call_getter(self, getter_name):
+        '''Calls the getter of the downloader with the given name.'''
+        return getattr(self.__downloader, getter_name)()
+
+    def __get_data(self, getter_name):
+        '''Returns the result of the given getter of the downloader, which is called only on the first use.'''
+        if getter_name not in self.__data:
+            self.__data[getter_name] = self.__call_getter(getter_name)
+
+        return self.__data[getter_name]
 
     def __fig_title(self, title):
         '''Extends the figure title with the name of the owner and the repository.'''
@@ -26,13 +61,10 @@ class Visualizer:
         '''Plots two graphs, one showing the total lines of code over time,
         the other the additions and deletions over time using line charts.'''
 
-        code_frequency = self.__downloader.get_code_frequency_statistic()
+        code_frequency = self.__get_data('get_code_frequency_statistic')
 
         # parsing necessary data
-        dates = code_frequency['date'].tolist()
-        date_objects = [
-            datetime.strptime(date, '%Y-%m-%d').date() for date in dates
-        ]
+        date_objects = code_frequency['date'].to_numpy()
 
         additions = code_frequency['additions'].to_numpy()
         deletions = code_frequency['deletions'].to_numpy()
@@ -65,23 +97,24 @@ class Visualizer:
         '''Plots a pie chart showing the top contributors based on the commit count.
         With the optional limit parameter the number of shown contributor can be modified.'''
 
-        total_contributions, _ = self.__downloader.get_contributors_statistic()
+        # the contributors are ordered by their commit counts
+        all_users, all_commits = self.__get_data('get_top_contributors')
 
         # overriding limit if it is out of bounds
-        if limit > len(total_contributions.index):
-            limit = len(total_contributions.index)
-
         if limit < 2:
             limit = 10
 
-        # parsing data
-        commits = total_contributions['commits'][-limit:].to_numpy()
-        users = total_contributions['user'][-limit:].to_numpy()
+        if limit > len(all_commits):
+            limit = len(all_commits)
 
-        rest = sum(total_contributions['commits'][:-limit].to_numpy())
+        # parsing data
+        commits = np.empty(limit + 1, dtype=all_commits.dtype)
+        commits[0] = all_commits[:-limit].sum()
+        commits[1:] = all_commits[-limit:]
 
-        commits = np.concatenate([[rest], commits])
-        users = np.concatenate([['Others'], users])
+        users = np.empty(limit + 1, dtype=object)
+        users[0] = 'Others'
+        users[1:] = all_users[-limit:]
 
         # commits by author - pie chart
         fig = plt.figure(figsize=self.__figsize)
@@ -104,25 +137,17 @@ class Visualizer:
         '''Plots two line charts, one showing the number of stars on the repo over time and 
         the other showing the number of new stars month by month.'''
 
-        stargazers = self.__downloader.get_stargazers()
-
-        # parsing data
-        stargazers_by_day = stargazers.groupby('starred_at',
-                                               as_index=False).count()
-        stargazers_by_day.columns = ['date', 'stargazer_count']
+        stargazers = self.__get_data('get_stargazers')
 
-        # aggregating by weeks
-        stargazers_by_week = stargazers_by_day
-        stargazers_by_week['date'] = to_datetime(stargazers_by_week['date'])
-        stargazers_by_week.index = stargazers_by_week['date']
-        stargazers_by_week = stargazers_by_week.resample('M').sum()
-        stargazers_by_week.reset_index(level=0, inplace=True)
+        # parsing data, counting the new stars day by day
+        stargazers_by_day = to_datetime(
+            stargazers['starred_at']).value_counts().sort_index()
 
-        stargazers_by_day['cum_stargazers'] = stargazers_by_day[
-            'stargazer_count'].cumsum()
+        # aggregating by months
+        stargazers_by_month = stargazers_by_day.resample('M').sum()
 
-        cum_stargazers = stargazers_by_day['cum_stargazers'].to_numpy()
-        dates = stargazers_by_day['date'].to_numpy()
+        cum_stargazers = stargazers_by_day.cumsum().to_numpy()
+        dates = stargazers_by_day.index.to_numpy()
 
         # number of stars over time - line chart
         plt.figure(figsize=self.__figsize)
@@ -132,8 +157,8 @@ class Visualizer:
         plt.title(self.__fig_title('Number of stars over time'))
         plt.ylabel('Stars')
 
-        stargazer_count = stargazers_by_week['stargazer_count'].to_numpy()
-        dates = stargazers_by_week['date'].to_numpy()
+        stargazer_count = stargazers_by_month.to_numpy()
+        dates = stargazers_by_month.index.to_numpy()
 
         # new stars aggregated by months - line chart
         plt.figure(figsize=self.__figsize)
@@ -147,7 +172,7 @@ class Visualizer:
     def commit_activity(self):
         '''Plots a grid/mash plot about the commit activity in the repository during the last year.'''
 
-        commit_activity = self.__downloader.get_commit_activity()
+        commit_activity = self.__get_data('get_commit_activity')
 
         # parsing data
         grid = commit_activity[[